@@ -9,6 +9,7 @@ Why this exists:
   and writes a summary.json that other tools/agents can consume.
 
 Dependencies: python3 stdlib, java, and a tla2tools.jar (set TLA2TOOLS_JAR or pass --jar).
+Optional: ijson >= 3.1 (stream-parses counterexample traces to bound memory).
 """
 
 from __future__ import annotations
@@ -19,23 +20,55 @@ import hashlib
 import json
 import os
 import shlex
+import signal
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 sys.dont_write_bytecode = True
 
+# tlc_trace_summary.py lives next to this script; import it once up front.
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+try:
+    from tlc_trace_summary import summarize_counterexample_json  # type: ignore
+except ImportError:
+    summarize_counterexample_json = None
+
 
 def _sha256_file(path: Path) -> str:
     h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
+    # Reuse one buffer across reads; we already read in large blocks, so skip
+    # the extra copy through io.BufferedReader.
+    buf = bytearray(1024 * 1024)
+    mv = memoryview(buf)
+    with path.open("rb", buffering=0) as f:
+        while True:
+            n = f.readinto(mv)
+            if not n:
+                break
+            h.update(mv[:n])
     return h.hexdigest()
 
 
+# Below this size thread startup costs more than overlapping the two hashes saves.
+_PARALLEL_HASH_MIN_BYTES = 256 * 1024
+
+
+def _sha256_inputs(spec_path: Path, cfg_path: Path) -> Tuple[str, str]:
+    paths = (spec_path, cfg_path)
+    if min(p.stat().st_size for p in paths) > _PARALLEL_HASH_MIN_BYTES:
+        # hashlib releases the GIL while hashing large buffers, so both files
+        # can be read and hashed concurrently.
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            spec_sha, cfg_sha = ex.map(_sha256_file, paths)
+    else:
+        spec_sha, cfg_sha = (_sha256_file(p) for p in paths)
+    return spec_sha, cfg_sha
+
+
 def _find_tla2tools_jar(spec_dir: Path, explicit: Optional[str]) -> Optional[Path]:
     if explicit:
         p = Path(explicit).expanduser()
@@ -67,13 +100,42 @@ def _find_tla2tools_jar(spec_dir: Path, explicit: Optional[str]) -> Optional[Pat
 def _mk_run_id(spec_path: Path, cfg_path: Path) -> str:
     ts = _dt.datetime.now().strftime("%Y%m%d-%H%M%S")
     try:
-        spec_h = _sha256_file(spec_path)[:8]
-        cfg_h = _sha256_file(cfg_path)[:8]
-        return f"{ts}-{spec_h}-{cfg_h}"
+        # Only needs to tag the run, not identify content (the full hashes go
+        # into summary.json), so stat metadata avoids reading the files here.
+        st_s = spec_path.stat()
+        st_c = cfg_path.stat()
+        key = f"{st_s.st_size}:{st_s.st_mtime_ns}:{spec_path}|{st_c.st_size}:{st_c.st_mtime_ns}:{cfg_path}"
+        return f"{ts}-{hashlib.blake2b(key.encode('utf-8'), digest_size=4).hexdigest()}"
     except Exception:
         return ts
 
 
+def _kill_process_tree(p: subprocess.Popen, *, grace_secs: float = 5.0) -> None:
+    # The JVM may have spawned helpers; signal the whole process group, giving
+    # it a chance to exit cleanly before forcing it.
+    if os.name != "posix":
+        p.kill()
+        p.wait()
+        return
+    try:
+        os.killpg(p.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    try:
+        p.wait(timeout=grace_secs)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    p.wait()
+
+
+def _raise_on_signal(signum: int, frame: Any) -> None:
+    raise SystemExit(128 + signum)
+
+
 def _pick_metadir(meta_root: Path) -> Optional[Path]:
     if not meta_root.exists():
         return None
@@ -85,18 +147,17 @@ def _pick_metadir(meta_root: Path) -> Optional[Path]:
     return subdirs[0]
 
 
-def _load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+def _encode_summary(summary: Dict[str, Any]) -> bytes:
+    # ensure_ascii keeps summary.json pure ASCII regardless of trace contents.
+    return (json.dumps(summary, indent=2, ensure_ascii=True) + "\n").encode("utf-8")
 
 
 def _summarize_trace(trace_path: Path, *, max_steps: int = 50) -> Optional[Dict[str, Any]]:
+    if summarize_counterexample_json is None:
+        return None
     try:
-        script_dir = Path(__file__).resolve().parent
-        sys.path.insert(0, str(script_dir))
-        from tlc_trace_summary import summarize_counterexample_json  # type: ignore
-
-        doc = _load_json(trace_path)
-        return summarize_counterexample_json(doc, max_steps=max_steps)
+        # Pass the path so the summarizer can stream-parse large traces.
+        return summarize_counterexample_json(trace_path, max_steps=max_steps)
     except Exception:
         return None
 
@@ -111,6 +172,11 @@ def _cmd() -> int:
     ap.add_argument("--timeout-secs", type=int, default=0, help="Kill TLC after N seconds (0 = no timeout)")
     ap.add_argument("--out-root", help="Run artifacts root dir (default: <spec-dir>/.tlaplus-workbench/runs)")
     ap.add_argument("--trace-max-steps", type=int, default=50, help="Max steps to summarize from JSON trace")
+    ap.add_argument(
+        "--no-trace-summary",
+        action="store_true",
+        help="Skip summarizing the JSON trace (status/exit code and counterexample_json_path are still reported)",
+    )
     args = ap.parse_args()
 
     spec_path = Path(args.spec).expanduser().resolve()
@@ -175,19 +241,36 @@ def _cmd() -> int:
     exit_code: int
     timed_out = False
     with stdout_path.open("w", encoding="utf-8") as out, stderr_path.open("w", encoding="utf-8") as err:
+        # Run TLC in its own process group so a timeout can stop the whole tree.
+        # That also means signals aimed at *our* group (Ctrl-C, or a harness
+        # cancelling us with SIGTERM/SIGHUP) no longer reach TLC, so turn them
+        # into exceptions and stop TLC ourselves before exiting.
+        prev_handlers: Dict[int, Any] = {}
+        if os.name == "posix":
+            for sig in (signal.SIGTERM, signal.SIGHUP):
+                prev_handlers[sig] = signal.signal(sig, _raise_on_signal)
+        p: Optional[subprocess.Popen] = None
         try:
-            p = subprocess.run(
+            p = subprocess.Popen(
                 cmd,
                 cwd=str(spec_dir),
                 stdout=out,
                 stderr=err,
-                text=True,
-                timeout=args.timeout_secs if args.timeout_secs and args.timeout_secs > 0 else None,
+                start_new_session=os.name == "posix",
             )
-            exit_code = p.returncode
-        except subprocess.TimeoutExpired:
-            timed_out = True
-            exit_code = 124
+            try:
+                exit_code = p.wait(timeout=args.timeout_secs if args.timeout_secs and args.timeout_secs > 0 else None)
+            except subprocess.TimeoutExpired:
+                _kill_process_tree(p)
+                timed_out = True
+                exit_code = 124
+        except BaseException:
+            if p is not None:
+                _kill_process_tree(p, grace_secs=0)
+            raise
+        finally:
+            for sig, handler in prev_handlers.items():
+                signal.signal(sig, handler)
 
     finished = time.time()
     finished_iso = _dt.datetime.now(_dt.timezone.utc).isoformat()
@@ -206,6 +289,8 @@ def _cmd() -> int:
     else:
         status = "error"
 
+    spec_sha256, cfg_sha256 = _sha256_inputs(spec_path, cfg_path)
+
     summary: Dict[str, Any] = {
         "status": status,
         "exit_code": exit_code,
@@ -219,8 +304,8 @@ def _cmd() -> int:
         "spec_dir": str(spec_dir),
         "jar_path": str(jar_path),
         "inputs": {
-            "spec_sha256": _sha256_file(spec_path),
-            "cfg_sha256": _sha256_file(cfg_path),
+            "spec_sha256": spec_sha256,
+            "cfg_sha256": cfg_sha256,
         },
         "command": cmd,
         "command_str": " ".join(shlex.quote(c) for c in cmd),
@@ -232,13 +317,18 @@ def _cmd() -> int:
         "counterexample_json_path": str(trace_path) if trace_exists else None,
     }
 
-    if trace_exists:
+    if trace_exists and not args.no_trace_summary:
         trace_summary = _summarize_trace(trace_path, max_steps=args.trace_max_steps)
         if trace_summary is not None:
             summary["counterexample_summary"] = trace_summary
 
-    summary_path.write_text(json.dumps(summary, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
-    sys.stdout.write(json.dumps(summary, indent=2, ensure_ascii=True) + "\n")
+    # Serialize once; the same document goes to summary.json and stdout.
+    payload = _encode_summary(summary)
+    summary_path.write_bytes(payload)
+    # Write the already-encoded bytes past the text layer in one go.
+    sys.stdout.flush()
+    sys.stdout.buffer.write(payload)
+    sys.stdout.buffer.flush()
 
     # Exit status communicates pass/fail to calling agents/CI without requiring JSON parsing.
     if status == "pass":
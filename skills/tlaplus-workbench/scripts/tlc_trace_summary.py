@@ -3,43 +3,38 @@
 Summarize a TLC -dumpTrace json counterexample into a small, agent-friendly form.
 
 This is intentionally dependency-free (stdlib only) and tolerant of minor schema
-changes by treating unknown fields as opaque.
+changes by treating unknown fields as opaque. If ijson (>= 3.1) is installed,
+trace files are stream-parsed so only the states that get emitted are held in
+memory; this trades some parse speed for a much smaller footprint.
 """
 
 from __future__ import annotations
 
 import argparse
+import heapq
+import itertools
 import json
 import sys
-from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-sys.dont_write_bytecode = True
-
-
-@dataclass(frozen=True)
-class TraceStep:
-    idx: int
-    state_number: int
-    action: Optional[Dict[str, Any]]
-    changed_vars: List[str]
+try:
+    import ijson  # type: ignore
+except ImportError:
+    ijson = None
 
-
-def _stable_json(v: Any) -> str:
-    # Used for deep-ish equality that is stable across dict key ordering.
-    try:
-        return json.dumps(v, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
-    except TypeError:
-        return repr(v)
+sys.dont_write_bytecode = True
 
 
 def _deep_equal(a: Any, b: Any) -> bool:
+    # Values come from json.loads (dict/list/str/int/float/bool/None), where
+    # native == is already structural and independent of dict key order.
+    # Keep the type check so e.g. True and 1 are not treated as equal.
+    if a is b:
+        return True
     if type(a) is not type(b):
         return False
-    if isinstance(a, (dict, list, str, int, float, bool)) or a is None:
-        return a == b
-    return _stable_json(a) == _stable_json(b)
+    return a == b
 
 
 def _parse_state_tuple(item: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
@@ -59,75 +54,119 @@ def _extract_counterexample(doc: Any) -> Dict[str, Any]:
     raise ValueError("counterexample json is not an object")
 
 
-def summarize_counterexample_json(doc: Any, *, max_steps: Optional[int] = None) -> Dict[str, Any]:
-    ce = _extract_counterexample(doc)
-
-    raw_states = ce.get("state")
-    if not isinstance(raw_states, list):
-        raise ValueError("counterexample.state is missing or not a list")
-
-    parsed_states: List[Tuple[int, Dict[str, Any]]] = []
-    for it in raw_states:
-        st = _parse_state_tuple(it)
-        if st is None:
-            continue
-        parsed_states.append(st)
+def _select_states(
+    raw_states: Iterable[Any], max_steps: Optional[int]
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+    # Returns the parsable states that will be emitted (ordered by state
+    # number) and the total number of parsable states seen.
+    total = 0
 
-    if not parsed_states:
-        raise ValueError("no parsable states found in counterexample.state")
+    def parsed() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        nonlocal total
+        for it in raw_states:
+            st = _parse_state_tuple(it)
+            if st is None:
+                continue
+            total += 1
+            yield st
+
+    # TLC emits states in increasing stateNumber, so only sort (or select)
+    # once the input turns out not to be in order.
+    states: List[Tuple[int, Dict[str, Any]]] = []
+    # At least one step is always emitted.
+    limit = max(max_steps, 1) if max_steps is not None else None
+    it = parsed()
+    for st in it:
+        if states and st[0] < states[-1][0]:
+            rest = itertools.chain(states, [st], it)
+            if limit is None:
+                states = sorted(rest, key=lambda t: t[0])
+            else:
+                # States dropped so far can't rank among the lowest `limit`,
+                # so selecting from what was kept plus the remainder is exact.
+                states = heapq.nsmallest(limit, rest, key=lambda t: t[0])
+            break
+        if limit is None or len(states) < limit:
+            states.append(st)
+
+    # The same variable names repeat in every state; intern them so the kept
+    # states share one key object per name (ijson doesn't memoize keys).
+    states = [(n, {sys.intern(k): v for k, v in d.items()}) for n, d in states]
+    return states, total
+
+
+def _summarize_stream(path: Path, *, max_steps: Optional[int]) -> Optional[Dict[str, Any]]:
+    # Two passes over the file: states first, then edges. Returns None if the
+    # file isn't shaped as {"counterexample": {"state": [...]}} so the caller
+    # can fall back to a full parse (and its error reporting).
+    with path.open("rb") as f:
+        states, total = _select_states(ijson.items(f, "counterexample.state.item", use_float=True), max_steps)
+    if not states:
+        return None
+    with path.open("rb") as f:
+        return _summarize_states(
+            states, total, ijson.items(f, "counterexample.action.item", use_float=True), max_steps=max_steps
+        )
 
-    parsed_states.sort(key=lambda t: t[0])
 
-    raw_actions = ce.get("action")
+def _summarize_states(
+    parsed_states: List[Tuple[int, Dict[str, Any]]],
+    states_total: int,
+    raw_actions: Iterable[Any],
+    *,
+    max_steps: Optional[int],
+) -> Dict[str, Any]:
+    emitted = {n for n, _ in parsed_states}
     action_by_to: Dict[int, Dict[str, Any]] = {}
     lasso_edges: List[Dict[str, Any]] = []
-    if isinstance(raw_actions, list):
-        for edge in raw_actions:
-            # Edge format: [ fromStateTuple, actionRecord, toStateTuple ]
-            if not (isinstance(edge, list) and len(edge) >= 3):
-                continue
-            from_st = _parse_state_tuple(edge[0])
-            action = edge[1] if isinstance(edge[1], dict) else None
-            to_st = _parse_state_tuple(edge[2])
-            if from_st is None or to_st is None:
-                continue
-            from_n, _ = from_st
-            to_n, _ = to_st
-            if action is None:
-                action = {"_raw": edge[1]}
-
-            # Detect lasso-closing edge (to an earlier state).
-            if to_n <= from_n:
-                lasso_edges.append({"from": from_n, "to": to_n, "action": action})
-                continue
+    for edge in raw_actions:
+        # Edge format: [ fromStateTuple, actionRecord, toStateTuple ]
+        if not (isinstance(edge, list) and len(edge) >= 3):
+            continue
+        from_st = _parse_state_tuple(edge[0])
+        action = edge[1] if isinstance(edge[1], dict) else None
+        to_st = _parse_state_tuple(edge[2])
+        if from_st is None or to_st is None:
+            continue
+        from_n, _ = from_st
+        to_n, _ = to_st
+        if action is None:
+            action = {"_raw": edge[1]}
+
+        # Detect lasso-closing edge (to an earlier state).
+        if to_n <= from_n:
+            lasso_edges.append({"from": from_n, "to": to_n, "action": action})
+            continue
 
-            # Regular step edge. Prefer first mapping if duplicates show up.
+        # Regular step edge. Prefer first mapping if duplicates show up.
+        if to_n in emitted:
             action_by_to.setdefault(to_n, {"from": from_n, "action": action})
 
-    steps: List[TraceStep] = []
+    steps: List[Dict[str, Any]] = []
     prev_state: Optional[Dict[str, Any]] = None
     for i, (state_num, state) in enumerate(parsed_states, start=1):
-        changed: List[str] = []
+        # Changed vars are listed in the order TLC emits them in the state
+        # (not re-sorted per step), followed by any that were dropped. A var
+        # present in only one of the two states always counts as changed, even
+        # if its value is null (missing and null are not treated as equal).
+        changed: List[str]
         if prev_state is None:
-            changed = sorted(state.keys())
+            changed = list(state)
         else:
-            keys = set(prev_state.keys()) | set(state.keys())
-            for k in keys:
-                if not _deep_equal(prev_state.get(k), state.get(k)):
-                    changed.append(k)
-            changed.sort()
+            changed = [k for k in state if k not in prev_state or not _deep_equal(prev_state[k], state[k])]
+            changed.extend(k for k in prev_state if k not in state)
 
         action_rec: Optional[Dict[str, Any]] = None
         if state_num in action_by_to:
             action_rec = action_by_to[state_num]["action"]
 
         steps.append(
-            TraceStep(
-                idx=i,
-                state_number=state_num,
-                action=action_rec,
-                changed_vars=changed,
-            )
+            {
+                "idx": i,
+                "state_number": state_num,
+                "action": action_rec,
+                "changed_vars": changed,
+            }
         )
         prev_state = state
 
@@ -135,21 +174,45 @@ def summarize_counterexample_json(doc: Any, *, max_steps: Optional[int] = None)
             break
 
     return {
-        "states_total": len(parsed_states),
+        "states_total": states_total,
         "steps_emitted": len(steps),
-        "steps": [
-            {
-                "idx": s.idx,
-                "state_number": s.state_number,
-                "action": s.action,
-                "changed_vars": s.changed_vars,
-            }
-            for s in steps
-        ],
+        "steps": steps,
         "lasso_edges": lasso_edges,
     }
 
 
+def summarize_counterexample_json(doc: Any, *, max_steps: Optional[int] = None) -> Dict[str, Any]:
+    """Summarize a parsed counterexample document, or a Path to a trace file."""
+    if isinstance(doc, Path):
+        if ijson is not None:
+            try:
+                summary = _summarize_stream(doc, max_steps=max_steps)
+            except TypeError:
+                # ijson < 3.1 doesn't accept use_float; fall back to a full parse.
+                summary = None
+            if summary is not None:
+                return summary
+        doc = json.loads(doc.read_text(encoding="utf-8"))
+
+    ce = _extract_counterexample(doc)
+
+    raw_states = ce.get("state")
+    if not isinstance(raw_states, list):
+        raise ValueError("counterexample.state is missing or not a list")
+
+    parsed_states, states_total = _select_states(raw_states, max_steps)
+    if not parsed_states:
+        raise ValueError("no parsable states found in counterexample.state")
+
+    raw_actions = ce.get("action")
+    return _summarize_states(
+        parsed_states,
+        states_total,
+        raw_actions if isinstance(raw_actions, list) else [],
+        max_steps=max_steps,
+    )
+
+
 def _cmd() -> int:
     ap = argparse.ArgumentParser(description="Summarize a TLC -dumpTrace json counterexample.")
     ap.add_argument("--trace", required=True, help="Path to counterexample.json produced by TLC -dumpTrace json")
@@ -157,9 +220,7 @@ def _cmd() -> int:
     ap.add_argument("--format", choices=["json", "text"], default="json")
     args = ap.parse_args()
 
-    path = Path(args.trace)
-    doc = json.loads(path.read_text(encoding="utf-8"))
-    summary = summarize_counterexample_json(doc, max_steps=args.max_steps)
+    summary = summarize_counterexample_json(Path(args.trace), max_steps=args.max_steps)
 
     if args.format == "json":
         sys.stdout.write(json.dumps(summary, indent=2, ensure_ascii=True) + "\n")